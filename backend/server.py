@@ -1,17 +1,24 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Body, Query, Response, status, UploadFile, File
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.middleware.gzip import GZipMiddleware
+from pymongo import AsyncMongoClient, WriteConcern
+from pymongo.errors import DuplicateKeyError
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import uuid
 from datetime import datetime, timedelta, timezone
 from passlib.hash import bcrypt
 import jwt
+import time
+from cachetools import TLRUCache, TTLCache
 from enum import Enum
 
 ROOT_DIR = Path(__file__).parent
@@ -19,16 +26,46 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncMongoClient(mongo_url)
 db = client[os.environ['DB_NAME']]
+# Bulk record inserts only need acknowledgement from the primary
+medical_records_bulk = db.medical_records.with_options(write_concern=WriteConcern(w=1))
 
 # JWT Configuration
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-here')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
+# Signing key prepared once instead of re-deriving the HMAC key on every decode
+JWT_KEY = jwt.PyJWK(
+    {"kty": "oct", "k": jwt.utils.base64url_encode(JWT_SECRET.encode()).decode()},
+    algorithm=JWT_ALGORITHM,
+)
+JWT_DECODE_OPTIONS = {"require": ["exp", "user_id"], "verify_signature": True, "verify_exp": True}
+
+# Password hashing; tune BCRYPT_ROUNDS to the deployment hardware (each step doubles the cost)
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '10'))
+password_hasher = bcrypt.using(rounds=BCRYPT_ROUNDS)
+password_executor = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="bcrypt")
+
+# List endpoint pagination
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+CURSOR_BATCH_SIZE = 500
+# Stable page order, newest first so new rows land on the first page.
+# Every list collection has a matching index; it is read in reverse for this sort.
+PAGE_INDEX = [("created_at", 1), ("id", 1)]
+PAGE_SORT = [("created_at", -1), ("id", -1)]
+TOTAL_COUNT_HEADER = "X-Total-Count"
+MAX_BATCH_SIZE = 1000
+
+# Verified tokens -> (exp, current user), each entry expiring with its token's exp claim
+token_cache = TLRUCache(maxsize=10_000, ttu=lambda _token, entry, _now: entry[0], timer=time.time)
+
+# Patient users -> their patient profile id; invalidated when the user creates a profile
+patient_id_cache = TTLCache(maxsize=10_000, ttl=300)
 
 # Create the main app
-app = FastAPI(title="Blockchain EHR System", version="1.0.0")
+app = FastAPI(title="Blockchain EHR System", version="1.0.0", default_response_class=ORJSONResponse)
 api_router = APIRouter(prefix="/api")
 security = HTTPBearer()
 
@@ -43,14 +80,25 @@ class Gender(str, Enum):
     FEMALE = "female"
     OTHER = "other"
 
+# Role sets used by the permission checks
+PRIVILEGED_ROLES = frozenset({UserRole.DOCTOR.value, UserRole.ADMIN.value})
+ALLOWED_PATIENT_WRITERS = PRIVILEGED_ROLES | {UserRole.PATIENT.value}
+
+# Field factories
+def new_id() -> str:
+    return uuid.uuid4().hex
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
 # Models
 class User(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     email: EmailStr
     full_name: str
     role: UserRole
     is_active: bool = True
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=utcnow)
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -68,7 +116,7 @@ class TokenResponse(BaseModel):
     user: User
 
 class Patient(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     user_id: str  # Reference to User
     date_of_birth: str
     gender: Gender
@@ -80,7 +128,7 @@ class Patient(BaseModel):
     allergies: List[str] = []
     chronic_conditions: List[str] = []
     current_medications: List[str] = []
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=utcnow)
 
 class PatientCreate(BaseModel):
     date_of_birth: str
@@ -95,17 +143,17 @@ class PatientCreate(BaseModel):
     current_medications: List[str] = []
 
 class MedicalRecord(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     patient_id: str
     doctor_id: str
-    visit_date: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    visit_date: datetime = Field(default_factory=utcnow)
     chief_complaint: str
     diagnosis: str
     treatment_plan: str
     prescriptions: List[str] = []
     notes: Optional[str] = None
     follow_up_date: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=utcnow)
 
 class MedicalRecordCreate(BaseModel):
     patient_id: str
@@ -117,36 +165,107 @@ class MedicalRecordCreate(BaseModel):
     follow_up_date: Optional[str] = None
 
 class MedicalDocument(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     patient_id: str
     doctor_id: str
     document_name: str
     document_type: str  # X-ray, Lab Report, etc.
     file_path: str
-    upload_date: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    upload_date: datetime = Field(default_factory=utcnow)
+
+class SystemStats(BaseModel):
+    patients: int
+    records: int
+    users: int
 
 # Helper functions
-def create_access_token(user_id: str, role: str) -> str:
-    expire = datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
+def create_access_token(user_id: str, role: str, patient_id: Optional[str] = None) -> str:
+    expire = utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS)
     to_encode = {"user_id": user_id, "role": role, "exp": expire}
-    return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    if patient_id:
+        to_encode["patient_id"] = patient_id
+    return jwt.encode(to_encode, JWT_KEY, algorithm=JWT_ALGORITHM)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.verify(plain_password, hashed_password)
+    return password_hasher.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return bcrypt.hash(password)
+    return password_hasher.hash(password)
+
+async def run_password_task(func, *args):
+    # bcrypt is CPU-bound; run it on the dedicated pool so the event loop keeps serving requests
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, func, *args)
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    token = credentials.credentials
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached[1]
+    
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get("user_id")
-        role = payload.get("role")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return {"user_id": user_id, "role": role}
+        payload = jwt.decode(token, JWT_KEY, algorithms=[JWT_ALGORITHM], options=JWT_DECODE_OPTIONS, leeway=0)
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    
+    current_user = {"user_id": payload["user_id"], "role": payload.get("role")}
+    if "patient_id" in payload:
+        current_user["patient_id"] = payload["patient_id"]
+    token_cache[token] = (payload["exp"], current_user)
+    return current_user
+
+async def resolve_patient_id(user_id: str) -> Optional[str]:
+    patient_id = patient_id_cache.get(user_id)
+    if patient_id is None:
+        patient_doc = await db.patients.find_one({"user_id": user_id}, {"id": 1})
+        if not patient_doc:
+            return None
+        patient_id = patient_id_cache[user_id] = patient_doc["id"]
+    return patient_id
+
+async def get_own_medical_records(user_id: str, skip: int, limit: int, include_total: bool = False) -> Tuple[List[dict], int]:
+    # Profile id not cached yet: join the records (and optionally their count) onto the profile in one round trip
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$limit": 1},
+        {"$project": {"_id": 0, "id": 1}},
+    ]
+    if include_total:
+        pipeline.append({"$lookup": {
+            "from": "medical_records",
+            "localField": "id",
+            "foreignField": "patient_id",
+            "pipeline": [{"$count": "n"}],
+            "as": "total",
+        }})
+    pipeline += [
+        {"$lookup": {
+            "from": "medical_records",
+            "localField": "id",
+            "foreignField": "patient_id",
+            "pipeline": [{"$sort": dict(PAGE_SORT)}, {"$skip": skip}, {"$limit": limit}, {"$project": {"_id": 0}}],
+            "as": "records",
+        }},
+        # Stream records as separate documents rather than one array bounded by the 16 MB BSON limit;
+        # an empty page still yields the profile row so its id can be cached
+        {"$unwind": {"path": "$records", "preserveNullAndEmptyArrays": True}},
+    ]
+    cursor = await db.patients.aggregate(pipeline)
+    docs = [doc async for doc in cursor]
+    if not docs:
+        return [], 0
+    patient_id_cache[user_id] = docs[0]["id"]
+    total = docs[0]["total"][0]["n"] if docs[0].get("total") else 0
+    return [doc["records"] for doc in docs if "records" in doc], total
+
+async def set_total_count(response: Response, collection, query: dict) -> None:
+    # Lets paging clients know how many rows exist beyond the current page;
+    # unfiltered totals come from collection metadata instead of a full count
+    if query:
+        total = await collection.count_documents(query)
+    else:
+        total = await collection.estimated_document_count()
+    response.headers[TOTAL_COUNT_HEADER] = str(total)
 
 # Auth Routes
 @api_router.post("/auth/register", response_model=TokenResponse)
@@ -157,7 +276,7 @@ async def register_user(user_data: UserCreate):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Hash password and create user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await run_password_task(get_password_hash, user_data.password)
     user = User(
         email=user_data.email,
         full_name=user_data.full_name,
@@ -165,9 +284,13 @@ async def register_user(user_data: UserCreate):
     )
     
     # Store user with hashed password
-    user_dict = user.dict()
+    user_dict = user.model_dump()
     user_dict["password_hash"] = hashed_password
-    await db.users.insert_one(user_dict)
+    try:
+        await db.users.insert_one(user_dict)
+    except DuplicateKeyError:
+        # A concurrent registration claimed the email after the check above
+        raise HTTPException(status_code=400, detail="Email already registered")
     
     # Generate token
     access_token = create_access_token(user.id, user.role.value)
@@ -178,42 +301,59 @@ async def register_user(user_data: UserCreate):
 async def login_user(login_data: UserLogin):
     # Find user
     user_doc = await db.users.find_one({"email": login_data.email})
-    if not user_doc or not verify_password(login_data.password, user_doc["password_hash"]):
+    if not user_doc or not await run_password_task(verify_password, login_data.password, user_doc["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    user = User(**{k: v for k, v in user_doc.items() if k != "password_hash"})
-    access_token = create_access_token(user.id, user.role.value)
+    del user_doc["password_hash"]
+    user = User(**user_doc)
+    patient_id = await resolve_patient_id(user.id) if user.role == UserRole.PATIENT else None
+    access_token = create_access_token(user.id, user.role.value, patient_id)
     
     return TokenResponse(access_token=access_token, user=user)
 
 @api_router.get("/auth/me", response_model=User)
 async def get_current_user_profile(current_user: dict = Depends(get_current_user)):
-    user_doc = await db.users.find_one({"id": current_user["user_id"]})
+    user_doc = await db.users.find_one({"id": current_user["user_id"]}, {"password_hash": 0})
     if not user_doc:
         raise HTTPException(status_code=404, detail="User not found")
-    return User(**{k: v for k, v in user_doc.items() if k != "password_hash"})
+    return User(**user_doc)
 
 # Patient Routes
 @api_router.post("/patients", response_model=Patient)
 async def create_patient_profile(patient_data: PatientCreate, current_user: dict = Depends(get_current_user)):
-    if current_user["role"] not in ["patient", "doctor", "admin"]:
+    if current_user["role"] not in ALLOWED_PATIENT_WRITERS:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    patient = Patient(user_id=current_user["user_id"], **patient_data.dict())
-    await db.patients.insert_one(patient.dict())
+    # patient_data is already validated; the remaining fields are server-generated
+    patient = Patient.model_construct(user_id=current_user["user_id"], **patient_data.model_dump())
+    await db.patients.insert_one(patient.model_dump())
+    patient_id_cache.pop(current_user["user_id"], None)
     return patient
 
 @api_router.get("/patients", response_model=List[Patient])
-async def get_patients(current_user: dict = Depends(get_current_user)):
-    if current_user["role"] not in ["doctor", "admin"]:
+async def get_patients(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = False,
+    current_user: dict = Depends(get_current_user),
+):
+    if current_user["role"] not in PRIVILEGED_ROLES:
         raise HTTPException(status_code=403, detail="Only doctors and admins can view all patients")
     
-    patients = await db.patients.find().to_list(length=None)
-    return [Patient(**patient) for patient in patients]
+    # Stored documents were validated on insert; response_model checks them once on the way out
+    cursor = (
+        db.patients.find({}, {"_id": 0})
+        .sort(PAGE_SORT).skip(skip).limit(limit).batch_size(CURSOR_BATCH_SIZE)
+    )
+    patients = [patient async for patient in cursor]
+    if include_total:
+        await set_total_count(response, db.patients, {})
+    return patients
 
 @api_router.get("/patients/me", response_model=Patient)
 async def get_my_patient_profile(current_user: dict = Depends(get_current_user)):
-    if current_user["role"] != "patient":
+    if current_user["role"] != UserRole.PATIENT.value:
         raise HTTPException(status_code=403, detail="Only patients can access this endpoint")
     
     patient_doc = await db.patients.find_one({"user_id": current_user["user_id"]})
@@ -223,9 +363,9 @@ async def get_my_patient_profile(current_user: dict = Depends(get_current_user))
 
 @api_router.get("/patients/{patient_id}", response_model=Patient)
 async def get_patient_by_id(patient_id: str, current_user: dict = Depends(get_current_user)):
-    if current_user["role"] not in ["doctor", "admin"]:
+    if current_user["role"] not in PRIVILEGED_ROLES:
         # Patients can only access their own profile
-        if current_user["role"] == "patient":
+        if current_user["role"] == UserRole.PATIENT.value:
             patient_doc = await db.patients.find_one({"id": patient_id, "user_id": current_user["user_id"]})
         else:
             raise HTTPException(status_code=403, detail="Not authorized")
@@ -239,51 +379,138 @@ async def get_patient_by_id(patient_id: str, current_user: dict = Depends(get_cu
 # Medical Records Routes
 @api_router.post("/medical-records", response_model=MedicalRecord)
 async def create_medical_record(record_data: MedicalRecordCreate, current_user: dict = Depends(get_current_user)):
-    if current_user["role"] not in ["doctor", "admin"]:
+    if current_user["role"] not in PRIVILEGED_ROLES:
         raise HTTPException(status_code=403, detail="Only doctors can create medical records")
     
-    record = MedicalRecord(doctor_id=current_user["user_id"], **record_data.dict())
-    await db.medical_records.insert_one(record.dict())
+    record = MedicalRecord.model_construct(doctor_id=current_user["user_id"], **record_data.model_dump())
+    await db.medical_records.insert_one(record.model_dump())
     return record
 
+@api_router.post("/medical-records/batch", response_model=List[MedicalRecord])
+async def create_medical_records_batch(
+    records_data: List[MedicalRecordCreate] = Body(..., max_length=MAX_BATCH_SIZE),
+    current_user: dict = Depends(get_current_user),
+):
+    if current_user["role"] not in PRIVILEGED_ROLES:
+        raise HTTPException(status_code=403, detail="Only doctors can create medical records")
+    
+    records = [
+        MedicalRecord.model_construct(doctor_id=current_user["user_id"], **record_data.model_dump())
+        for record_data in records_data
+    ]
+    if records:
+        # One round trip for the whole batch
+        await medical_records_bulk.insert_many([record.model_dump() for record in records], ordered=False)
+    return records
+
 @api_router.get("/medical-records", response_model=List[MedicalRecord])
-async def get_medical_records(patient_id: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+async def get_medical_records(
+    response: Response,
+    patient_id: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = False,
+    current_user: dict = Depends(get_current_user),
+):
     query = {}
-    
-    if current_user["role"] == "patient":
+    if current_user["role"] == UserRole.PATIENT.value:
         # Patients can only see their own records
-        patient_doc = await db.patients.find_one({"user_id": current_user["user_id"]})
-        if not patient_doc:
-            return []
-        query["patient_id"] = patient_doc["id"]
-    elif current_user["role"] in ["doctor", "admin"] and patient_id:
+        own_patient_id = current_user.get("patient_id") or patient_id_cache.get(current_user["user_id"])
+        if own_patient_id is not None:
+            query["patient_id"] = own_patient_id
+        else:
+            records, total = await get_own_medical_records(current_user["user_id"], skip, limit, include_total)
+            if include_total:
+                response.headers[TOTAL_COUNT_HEADER] = str(total)
+            return records
+    elif current_user["role"] in PRIVILEGED_ROLES and patient_id:
         query["patient_id"] = patient_id
     
-    records = await db.medical_records.find(query).to_list(length=None)
-    return [MedicalRecord(**record) for record in records]
+    cursor = (
+        db.medical_records.find(query, {"_id": 0})
+        .sort(PAGE_SORT).skip(skip).limit(limit).batch_size(CURSOR_BATCH_SIZE)
+    )
+    records = [record async for record in cursor]
+    if include_total:
+        await set_total_count(response, db.medical_records, query)
+    return records
 
 @api_router.get("/medical-records/{record_id}", response_model=MedicalRecord)
 async def get_medical_record(record_id: str, current_user: dict = Depends(get_current_user)):
-    record_doc = await db.medical_records.find_one({"id": record_id})
-    if not record_doc:
-        raise HTTPException(status_code=404, detail="Medical record not found")
+    is_patient = current_user["role"] == UserRole.PATIENT.value
+    own_patient_id = None
+    if is_patient:
+        own_patient_id = current_user.get("patient_id") or patient_id_cache.get(current_user["user_id"])
     
-    # Check permissions
-    if current_user["role"] == "patient":
-        patient_doc = await db.patients.find_one({"user_id": current_user["user_id"]})
-        if not patient_doc or record_doc["patient_id"] != patient_doc["id"]:
+    if is_patient and own_patient_id is None:
+        # Profile id unknown: join the owning profile so the permission check needs no extra round trip
+        pipeline = [
+            {"$match": {"id": record_id}},
+            {"$limit": 1},
+            {"$project": {"_id": 0}},
+            {"$lookup": {
+                "from": "patients",
+                "localField": "patient_id",
+                "foreignField": "id",
+                "pipeline": [{"$project": {"_id": 0, "id": 1, "user_id": 1}}],
+                "as": "owners",
+            }},
+        ]
+        cursor = await db.medical_records.aggregate(pipeline)
+        record_docs = await cursor.to_list(length=1)
+        if not record_docs:
+            raise HTTPException(status_code=404, detail="Medical record not found")
+        record_doc = record_docs[0]
+        owners = record_doc.pop("owners")
+        owner = next((owner for owner in owners if owner.get("user_id") == current_user["user_id"]), None)
+        if owner is None:
+            raise HTTPException(status_code=403, detail="Not authorized to view this record")
+        # Later requests by this patient can compare ids directly and skip the join
+        patient_id_cache[current_user["user_id"]] = owner["id"]
+    else:
+        record_doc = await db.medical_records.find_one({"id": record_id}, {"_id": 0})
+        if not record_doc:
+            raise HTTPException(status_code=404, detail="Medical record not found")
+        
+        # Check permissions
+        if is_patient and record_doc["patient_id"] != own_patient_id:
             raise HTTPException(status_code=403, detail="Not authorized to view this record")
     
     return MedicalRecord(**record_doc)
 
 # Users management for doctors/admins
 @api_router.get("/users", response_model=List[User])
-async def get_users(current_user: dict = Depends(get_current_user)):
-    if current_user["role"] not in ["doctor", "admin"]:
+async def get_users(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = False,
+    current_user: dict = Depends(get_current_user),
+):
+    if current_user["role"] not in PRIVILEGED_ROLES:
         raise HTTPException(status_code=403, detail="Only doctors and admins can view users")
     
-    users = await db.users.find().to_list(length=None)
-    return [User(**{k: v for k, v in user.items() if k != "password_hash"}) for user in users]
+    cursor = (
+        db.users.find({}, {"_id": 0, "password_hash": 0})
+        .sort(PAGE_SORT).skip(skip).limit(limit).batch_size(CURSOR_BATCH_SIZE)
+    )
+    users = [user async for user in cursor]
+    if include_total:
+        await set_total_count(response, db.users, {})
+    return users
+
+@api_router.get("/stats", response_model=SystemStats)
+async def get_system_stats(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] not in PRIVILEGED_ROLES:
+        raise HTTPException(status_code=403, detail="Only doctors and admins can view system statistics")
+    
+    # Dashboard totals from collection metadata, fetched concurrently
+    patients, records, users = await asyncio.gather(
+        db.patients.estimated_document_count(),
+        db.medical_records.estimated_document_count(),
+        db.users.estimated_document_count(),
+    )
+    return SystemStats(patients=patients, records=records, users=users)
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -294,8 +521,12 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[TOTAL_COUNT_HEADER],
 )
 
+# Compress larger payloads such as the list endpoints
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -303,6 +534,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_indexes():
+    await db.users.create_index("email", unique=True)
+    await db.users.create_index("id", unique=True)
+    await db.users.create_index(PAGE_INDEX)
+    await db.patients.create_index("user_id")
+    await db.patients.create_index("id", unique=True)
+    await db.patients.create_index(PAGE_INDEX)
+    # Prefix also serves plain patient_id lookups and the per-patient page order
+    await db.medical_records.create_index([("patient_id", 1), *PAGE_INDEX])
+    await db.medical_records.create_index("id", unique=True)
+    await db.medical_records.create_index(PAGE_INDEX)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    await client.close()
+    password_executor.shutdown(wait=False)
\ No newline at end of file
@@ -4,7 +4,8 @@ Comprehensive Backend API Testing for EHR System
 Tests all authentication, patient, medical record, and user management endpoints
 """
 
-import requests
+import asyncio
+import httpx
 import sys
 import json
 from datetime import datetime
@@ -20,6 +21,7 @@ class EHRAPITester:
         self.records = {}   # Store medical record data
         self.tests_run = 0
         self.tests_passed = 0
+        self.client: Optional[httpx.AsyncClient] = None  # Opened by run_all_tests
         
     def log_test(self, name: str, success: bool, details: str = ""):
         """Log test results"""
@@ -31,26 +33,18 @@ class EHRAPITester:
             print(f"❌ {name} - FAILED {details}")
         return success
 
-    def make_request(self, method: str, endpoint: str, data: Optional[Dict] = None, 
-                    token: Optional[str] = None, expected_status: int = 200) -> tuple:
+    async def make_request(self, method: str, endpoint: str, data: Optional[Dict] = None, 
+                          token: Optional[str] = None, expected_status: int = 200) -> tuple:
         """Make HTTP request with proper headers"""
-        url = f"{self.api_url}/{endpoint}"
-        headers = {'Content-Type': 'application/json'}
+        headers = {}
         
         if token:
             headers['Authorization'] = f'Bearer {token}'
             
         try:
-            if method == 'GET':
-                response = requests.get(url, headers=headers, timeout=10)
-            elif method == 'POST':
-                response = requests.post(url, json=data, headers=headers, timeout=10)
-            elif method == 'PUT':
-                response = requests.put(url, json=data, headers=headers, timeout=10)
-            elif method == 'DELETE':
-                response = requests.delete(url, headers=headers, timeout=10)
-            else:
+            if method not in ('GET', 'POST', 'PUT', 'DELETE'):
                 return False, {"error": f"Unsupported method: {method}"}
+            response = await self.client.request(method, endpoint, json=data, headers=headers)
                 
             success = response.status_code == expected_status
             try:
@@ -63,7 +57,7 @@ class EHRAPITester:
         except Exception as e:
             return False, {"error": str(e)}
 
-    def test_user_registration(self):
+    async def test_user_registration(self):
         """Test user registration for different roles"""
         print("\n🔐 Testing User Registration...")
         
@@ -89,9 +83,13 @@ class EHRAPITester:
             }
         ]
         
-        for user_data in test_users:
-            success, response = self.make_request('POST', 'auth/register', user_data, expected_status=200)
-            
+        # Register all roles concurrently
+        results = await asyncio.gather(*(
+            self.make_request('POST', 'auth/register', user_data, expected_status=200)
+            for user_data in test_users
+        ))
+        
+        for user_data, (success, response) in zip(test_users, results):
             if success and 'access_token' in response:
                 self.tokens[user_data['role']] = response['access_token']
                 self.users[user_data['role']] = response['user']
@@ -102,54 +100,52 @@ class EHRAPITester:
                 
         return True
 
-    def test_user_login(self):
+    async def test_user_login(self):
         """Test user login functionality"""
         print("\n🔑 Testing User Login...")
         
-        # Test login for each registered user
-        for role in ['doctor', 'patient', 'admin']:
-            if role not in self.users:
-                continue
-                
-            login_data = {
-                "email": self.users[role]['email'],
-                "password": "TestPass123!"
-            }
-            
-            success, response = self.make_request('POST', 'auth/login', login_data, expected_status=200)
-            
-            if success and 'access_token' in response:
+        # Test login for each registered user, plus an invalid login, concurrently
+        roles = [role for role in ['doctor', 'patient', 'admin'] if role in self.users]
+        invalid_login = {"email": "invalid@test.com", "password": "wrongpass"}
+        *results, (success, response) = await asyncio.gather(
+            *(self.make_request('POST', 'auth/login',
+                                {"email": self.users[role]['email'], "password": "TestPass123!"},
+                                expected_status=200)
+              for role in roles),
+            self.make_request('POST', 'auth/login', invalid_login, expected_status=401),
+        )
+        
+        for role, (role_success, role_response) in zip(roles, results):
+            if role_success and 'access_token' in role_response:
                 # Update token (should be same as registration token)
-                self.tokens[role] = response['access_token']
+                self.tokens[role] = role_response['access_token']
                 self.log_test(f"Login {role}", True, f"- Token received")
             else:
-                self.log_test(f"Login {role}", False, f"- {response}")
+                self.log_test(f"Login {role}", False, f"- {role_response}")
                 
         # Test invalid login
-        invalid_login = {"email": "invalid@test.com", "password": "wrongpass"}
-        success, response = self.make_request('POST', 'auth/login', invalid_login, expected_status=401)
         self.log_test("Invalid login rejection", success, f"- Status 401 received")
 
-    def test_auth_me(self):
+    async def test_auth_me(self):
         """Test /auth/me endpoint"""
         print("\n👤 Testing Auth Me Endpoint...")
         
-        for role in ['doctor', 'patient', 'admin']:
-            if role not in self.tokens:
-                continue
-                
-            success, response = self.make_request('GET', 'auth/me', token=self.tokens[role])
-            
-            if success and 'email' in response:
+        roles = [role for role in ['doctor', 'patient', 'admin'] if role in self.tokens]
+        *results, (success, response) = await asyncio.gather(
+            *(self.make_request('GET', 'auth/me', token=self.tokens[role]) for role in roles),
+            self.make_request('GET', 'auth/me', expected_status=401),
+        )
+        
+        for role, (role_success, role_response) in zip(roles, results):
+            if role_success and 'email' in role_response:
                 self.log_test(f"Auth me - {role}", True, f"- User data received")
             else:
-                self.log_test(f"Auth me - {role}", False, f"- {response}")
+                self.log_test(f"Auth me - {role}", False, f"- {role_response}")
                 
         # Test without token
-        success, response = self.make_request('GET', 'auth/me', expected_status=401)
         self.log_test("Auth me without token", success, f"- Unauthorized access blocked")
 
-    def test_patient_creation(self):
+    async def test_patient_creation(self):
         """Test patient profile creation"""
         print("\n🏥 Testing Patient Creation...")
         
@@ -166,36 +162,37 @@ class EHRAPITester:
             "current_medications": ["Lisinopril"]
         }
         
-        # Test patient creating their own profile
-        if 'patient' in self.tokens:
-            success, response = self.make_request('POST', 'patients', patient_data, 
-                                                token=self.tokens['patient'], expected_status=200)
-            if success and 'id' in response:
-                self.patients['patient_profile'] = response
-                self.log_test("Patient creates own profile", True, f"- Patient ID: {response['id']}")
-            else:
-                self.log_test("Patient creates own profile", False, f"- {response}")
-                
-        # Test doctor creating patient profile
-        if 'doctor' in self.tokens:
-            success, response = self.make_request('POST', 'patients', patient_data,
-                                                token=self.tokens['doctor'], expected_status=200)
+        # Test patient creating their own profile and doctor creating a patient profile concurrently
+        creators = [
+            (role, key, name) for role, key, name in [
+                ('patient', 'patient_profile', "Patient creates own profile"),
+                ('doctor', 'doctor_created', "Doctor creates patient profile"),
+            ] if role in self.tokens
+        ]
+        results = await asyncio.gather(*(
+            self.make_request('POST', 'patients', patient_data,
+                              token=self.tokens[role], expected_status=200)
+            for role, _, _ in creators
+        ))
+        
+        for (_, key, name), (success, response) in zip(creators, results):
             if success and 'id' in response:
-                self.patients['doctor_created'] = response
-                self.log_test("Doctor creates patient profile", True, f"- Patient ID: {response['id']}")
+                self.patients[key] = response
+                self.log_test(name, True, f"- Patient ID: {response['id']}")
             else:
-                self.log_test("Doctor creates patient profile", False, f"- {response}")
+                self.log_test(name, False, f"- {response}")
 
-    def test_patient_access_control(self):
+    async def test_patient_access_control(self):
         """Test role-based access control for patients"""
         print("\n🔒 Testing Patient Access Control...")
         
         # Test doctor/admin can view all patients
-        for role in ['doctor', 'admin']:
-            if role not in self.tokens:
-                continue
-                
-            success, response = self.make_request('GET', 'patients', token=self.tokens[role])
+        roles = [role for role in ['doctor', 'admin'] if role in self.tokens]
+        results = await asyncio.gather(*(
+            self.make_request('GET', 'patients', token=self.tokens[role]) for role in roles
+        ))
+        
+        for role, (success, response) in zip(roles, results):
             if success and isinstance(response, list):
                 self.log_test(f"{role} views all patients", True, f"- Found {len(response)} patients")
             else:
@@ -203,17 +200,19 @@ class EHRAPITester:
                 
         # Test patient can only view own profile via /patients/me
         if 'patient' in self.tokens:
-            success, response = self.make_request('GET', 'patients/me', token=self.tokens['patient'])
+            (success, response), (blocked, _) = await asyncio.gather(
+                self.make_request('GET', 'patients/me', token=self.tokens['patient']),
+                self.make_request('GET', 'patients', token=self.tokens['patient'], expected_status=403),
+            )
             if success and 'id' in response:
                 self.log_test("Patient views own profile", True, f"- Profile retrieved")
             else:
                 self.log_test("Patient views own profile", False, f"- {response}")
                 
             # Test patient cannot view all patients
-            success, response = self.make_request('GET', 'patients', token=self.tokens['patient'], expected_status=403)
-            self.log_test("Patient blocked from all patients", success, f"- Access denied")
+            self.log_test("Patient blocked from all patients", blocked, f"- Access denied")
 
-    def test_medical_records(self):
+    async def test_medical_records(self):
         """Test medical record creation and access"""
         print("\n📋 Testing Medical Records...")
         
@@ -240,41 +239,57 @@ class EHRAPITester:
         
         # Test doctor creating medical record
         if 'doctor' in self.tokens:
-            success, response = self.make_request('POST', 'medical-records', record_data,
-                                                token=self.tokens['doctor'], expected_status=200)
+            success, response = await self.make_request('POST', 'medical-records', record_data,
+                                                        token=self.tokens['doctor'], expected_status=200)
             if success and 'id' in response:
                 self.records['test_record'] = response
                 self.log_test("Doctor creates medical record", True, f"- Record ID: {response['id']}")
             else:
                 self.log_test("Doctor creates medical record", False, f"- {response}")
                 
+        # Test doctor creating several medical records in one batch
+        if 'doctor' in self.tokens:
+            batch_data = [
+                {**record_data, "chief_complaint": "Shortness of breath", "diagnosis": "Asthma"},
+                {**record_data, "chief_complaint": "Headache", "diagnosis": "Migraine"},
+            ]
+            success, response = await self.make_request('POST', 'medical-records/batch', batch_data,
+                                                        token=self.tokens['doctor'], expected_status=200)
+            if success and isinstance(response, list) and len(response) == len(batch_data):
+                self.records['batch_records'] = response
+                self.log_test("Doctor creates medical record batch", True, f"- {len(response)} records created")
+            else:
+                self.log_test("Doctor creates medical record batch", False, f"- {response}")
+                
         # Test patient cannot create medical record
         if 'patient' in self.tokens:
-            success, response = self.make_request('POST', 'medical-records', record_data,
-                                                token=self.tokens['patient'], expected_status=403)
+            success, response = await self.make_request('POST', 'medical-records', record_data,
+                                                        token=self.tokens['patient'], expected_status=403)
             self.log_test("Patient blocked from creating record", success, f"- Access denied")
             
         # Test viewing medical records
-        for role in ['doctor', 'patient', 'admin']:
-            if role not in self.tokens:
-                continue
-                
-            success, response = self.make_request('GET', 'medical-records', token=self.tokens[role])
+        roles = [role for role in ['doctor', 'patient', 'admin'] if role in self.tokens]
+        results = await asyncio.gather(*(
+            self.make_request('GET', 'medical-records', token=self.tokens[role]) for role in roles
+        ))
+        
+        for role, (success, response) in zip(roles, results):
             if success and isinstance(response, list):
                 self.log_test(f"{role} views medical records", True, f"- Found {len(response)} records")
             else:
                 self.log_test(f"{role} views medical records", False, f"- {response}")
 
-    def test_users_endpoint(self):
+    async def test_users_endpoint(self):
         """Test users management endpoint"""
         print("\n👥 Testing Users Management...")
         
         # Test doctor/admin can view users
-        for role in ['doctor', 'admin']:
-            if role not in self.tokens:
-                continue
-                
-            success, response = self.make_request('GET', 'users', token=self.tokens[role])
+        roles = [role for role in ['doctor', 'admin'] if role in self.tokens]
+        results = await asyncio.gather(*(
+            self.make_request('GET', 'users', token=self.tokens[role]) for role in roles
+        ))
+        
+        for role, (success, response) in zip(roles, results):
             if success and isinstance(response, list):
                 self.log_test(f"{role} views users", True, f"- Found {len(response)} users")
             else:
@@ -282,42 +297,108 @@ class EHRAPITester:
                 
         # Test patient cannot view users
         if 'patient' in self.tokens:
-            success, response = self.make_request('GET', 'users', token=self.tokens['patient'], expected_status=403)
+            success, response = await self.make_request('GET', 'users', token=self.tokens['patient'], expected_status=403)
             self.log_test("Patient blocked from users", success, f"- Access denied")
 
-    def test_error_handling(self):
+    async def test_stats(self):
+        """Test dashboard statistics endpoint"""
+        print("\n📊 Testing Statistics...")
+        
+        roles = [role for role in ['doctor', 'admin'] if role in self.tokens]
+        results = await asyncio.gather(*(
+            self.make_request('GET', 'stats', token=self.tokens[role]) for role in roles
+        ))
+        
+        for role, (success, response) in zip(roles, results):
+            if success and all(key in response for key in ('patients', 'records', 'users')):
+                self.log_test(f"{role} views stats", True, f"- {response}")
+            else:
+                self.log_test(f"{role} views stats", False, f"- {response}")
+                
+        # Test patient cannot view stats
+        if 'patient' in self.tokens:
+            success, response = await self.make_request('GET', 'stats', token=self.tokens['patient'], expected_status=403)
+            self.log_test("Patient blocked from stats", success, f"- Access denied")
+
+    async def test_pagination(self):
+        """Test skip/limit paging and the total count header on list endpoints"""
+        print("\n📄 Testing Pagination...")
+        
+        if 'doctor' not in self.tokens:
+            return
+            
+        headers = {'Authorization': f"Bearer {self.tokens['doctor']}"}
+        endpoints = ['patients', 'medical-records', 'users']
+        try:
+            # First and second single-row pages of every list, fetched concurrently
+            responses = await asyncio.gather(*(
+                self.client.get(endpoint, params={'skip': skip, 'limit': 1, 'include_total': 'true'}, headers=headers)
+                for endpoint in endpoints for skip in (0, 1)
+            ))
+        except Exception as e:
+            self.log_test("Paginated list requests", False, f"- {e}")
+            return
+            
+        for endpoint, first, second in zip(endpoints, responses[::2], responses[1::2]):
+            total = first.headers.get('X-Total-Count')
+            success = (first.status_code == 200 and len(first.json()) <= 1
+                       and total is not None and int(total) >= len(first.json()))
+            self.log_test(f"{endpoint} page of 1", success, f"- Total count: {total}")
+            
+            # Setup created at least two rows in each list, so skip=1 must move to a different row
+            first_ids = [item.get('id') for item in first.json()] if first.status_code == 200 else []
+            second_ids = [item.get('id') for item in second.json()] if second.status_code == 200 else []
+            success = len(first_ids) == 1 and len(second_ids) == 1 and first_ids != second_ids
+            self.log_test(f"{endpoint} skip=1 returns next row", success, f"- {first_ids} then {second_ids}")
+            
+        # Test out-of-range paging parameters are rejected
+        (bad_limit, _), (bad_skip, _) = await asyncio.gather(
+            self.make_request('GET', 'patients?limit=0', token=self.tokens['doctor'], expected_status=422),
+            self.make_request('GET', 'patients?skip=-1', token=self.tokens['doctor'], expected_status=422),
+        )
+        self.log_test("Invalid limit rejected", bad_limit, f"- Validation error")
+        self.log_test("Invalid skip rejected", bad_skip, f"- Validation error")
+
+    async def test_error_handling(self):
         """Test API error handling"""
         print("\n⚠️ Testing Error Handling...")
         
         # Test invalid endpoints
-        success, response = self.make_request('GET', 'invalid-endpoint', expected_status=404)
+        success, response = await self.make_request('GET', 'invalid-endpoint', expected_status=404)
         self.log_test("Invalid endpoint returns 404", success, f"- Not found error")
         
         # Test malformed data
         if 'doctor' in self.tokens:
             invalid_patient = {"invalid": "data"}
-            success, response = self.make_request('POST', 'patients', invalid_patient,
-                                                token=self.tokens['doctor'], expected_status=422)
+            success, response = await self.make_request('POST', 'patients', invalid_patient,
+                                                        token=self.tokens['doctor'], expected_status=422)
             self.log_test("Malformed data rejected", success, f"- Validation error")
 
-    def run_all_tests(self):
+    async def run_all_tests(self):
         """Run comprehensive test suite"""
         print("🚀 Starting EHR System Backend API Tests")
         print(f"📡 Testing against: {self.base_url}")
         print("=" * 60)
         
-        # Test sequence
-        if not self.test_user_registration():
-            print("❌ Registration failed - stopping tests")
-            return False
+        # Test sequence; each phase depends on state from the previous one.
+        # Concurrent requests within a phase share one multiplexed HTTP/2 connection.
+        async with httpx.AsyncClient(base_url=self.api_url, timeout=10, http2=True,
+                                     headers={'Content-Type': 'application/json'}) as client:
+            self.client = client
             
-        self.test_user_login()
-        self.test_auth_me()
-        self.test_patient_creation()
-        self.test_patient_access_control()
-        self.test_medical_records()
-        self.test_users_endpoint()
-        self.test_error_handling()
+            if not await self.test_user_registration():
+                print("❌ Registration failed - stopping tests")
+                return False
+                
+            await self.test_user_login()
+            await self.test_auth_me()
+            await self.test_patient_creation()
+            await self.test_patient_access_control()
+            await self.test_medical_records()
+            await self.test_users_endpoint()
+            await self.test_stats()
+            await self.test_pagination()
+            await self.test_error_handling()
         
         # Print summary
         print("\n" + "=" * 60)
@@ -334,7 +415,7 @@ class EHRAPITester:
 def main():
     """Main test execution"""
     tester = EHRAPITester()
-    success = tester.run_all_tests()
+    success = asyncio.run(tester.run_all_tests())
     return 0 if success else 1
 
 if __name__ == "__main__":
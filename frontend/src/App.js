@@ -28,6 +28,20 @@ import './App.css';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 // API base endpoint for all backend requests
 const API = `${BACKEND_URL}/api`;
+// Largest page the list endpoints accept
+const PAGE_SIZE = 1000;
+
+// List endpoints are paginated; walk every page so views are never cut off
+const fetchAllPages = async (url) => {
+  const items = [];
+  for (let skip = 0; ; skip += PAGE_SIZE) {
+    const response = await axios.get(url, { params: { skip, limit: PAGE_SIZE } });
+    items.push(...response.data);
+    if (response.data.length < PAGE_SIZE) {
+      return items;
+    }
+  }
+};
 
 // ============================================================================
 // AUTHENTICATION CONTEXT
@@ -686,8 +700,7 @@ const MedicalRecords = () => {
 
   const fetchRecords = async () => {
     try {
-      const response = await axios.get(`${API}/medical-records`);
-      setRecords(response.data);
+      setRecords(await fetchAllPages(`${API}/medical-records`));
     } catch (error) {
       console.error('Failed to fetch medical records:', error);
     }
@@ -695,8 +708,7 @@ const MedicalRecords = () => {
 
   const fetchPatients = async () => {
     try {
-      const response = await axios.get(`${API}/patients`);
-      setPatients(response.data);
+      setPatients(await fetchAllPages(`${API}/patients`));
     } catch (error) {
       console.error('Failed to fetch patients:', error);
     }
@@ -958,8 +970,7 @@ const PatientsManagement = () => {
 
   const fetchPatients = async () => {
     try {
-      const response = await axios.get(`${API}/patients`);
-      setPatients(response.data);
+      setPatients(await fetchAllPages(`${API}/patients`));
     } catch (error) {
       console.error('Failed to fetch patients:', error);
     }
@@ -967,8 +978,7 @@ const PatientsManagement = () => {
 
   const fetchUsers = async () => {
     try {
-      const response = await axios.get(`${API}/users`);
-      setUsers(response.data);
+      setUsers(await fetchAllPages(`${API}/users`));
     } catch (error) {
       console.error('Failed to fetch users:', error);
     }
@@ -1083,21 +1093,16 @@ const Dashboard = () => {
   const fetchStats = async () => {
     try {
       if (user.role === 'doctor' || user.role === 'admin') {
-        const [patientsRes, recordsRes, usersRes] = await Promise.all([
-          axios.get(`${API}/patients`),
-          axios.get(`${API}/medical-records`),
-          axios.get(`${API}/users`),
-        ]);
-        setStats({
-          patients: patientsRes.data.length,
-          records: recordsRes.data.length,
-          users: usersRes.data.length,
-        });
+        const response = await axios.get(`${API}/stats`);
+        setStats(response.data);
       } else {
-        const recordsRes = await axios.get(`${API}/medical-records`);
+        // Only the total is needed, so request the smallest page and read it from the header
+        const recordsRes = await axios.get(`${API}/medical-records`, {
+          params: { limit: 1, include_total: true },
+        });
         setStats({
           patients: 1,
-          records: recordsRes.data.length,
+          records: Number(recordsRes.headers['x-total-count'] ?? recordsRes.data.length),
           users: 1,
         });
       }